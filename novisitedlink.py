@@ -1,31 +1,187 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
 import re
-import spacy
-import pandas as pd
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin, urlparse, urlsplit, urlunsplit
 import time
 import logging
 import streamlit as st
 from io import BytesIO
-from duckduckgo_search import DDGS
+import html
 import json
 import os
+import tempfile
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
 
-# Load spaCy model
-nlp = spacy.load("en_core_web_sm")
+# Use RE2's linear-time engine for contact matching when it is installed
+# (pip install google-re2). RE2's \b, \d and \s are ASCII-only, so the stdlib
+# fallback is compiled with re.ASCII to give the same matches.
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+def compile_contact_re(pattern, use_re2=re2 is not None):
+    if use_re2:
+        return re2.compile(pattern)
+    return re.compile(pattern, re.ASCII)
+
+# spaCy, pandas, BeautifulSoup and DDGS are imported where they are used so
+# the Streamlit app starts without loading them
+
+# Load spaCy model on first use and share it across sessions; only the NER
+# component (and its tok2vec) is used
+@st.cache_resource
+def get_nlp():
+    import spacy
+    # Run on the GPU when requested and available; falls back to CPU otherwise
+    if os.environ.get("SCRAPER_USE_GPU") == "1":
+        spacy.prefer_gpu()
+    return spacy.load("en_core_web_sm", exclude=["tagger", "parser", "attribute_ruler", "lemmatizer"])
+
+SPACY_BATCH_SIZE = int(os.environ.get("SPACY_BATCH_SIZE", 64))
+NER_CONTEXT = 500  # characters of text kept either side of each contact match
+MAX_TEXT_LENGTH = 200_000  # characters of page text passed to NER
+NON_TEXT_TAGS = ['script', 'style', 'noscript', 'template', 'svg']
 
 # Logging setup
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # India-specific regex
-EMAIL_REGEX = r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+"
-PHONE_REGEX = r"(?:(?:\+|00)?91[\s\-]?)?[6-9]\d{9}"
+EMAIL_REGEX = r"\b[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+\b"
+PHONE_REGEX = r"(?:\+91[\s\-]?|\b(?:(?:0091|91)[\s\-]?|0)|\b)[6-9]\d{9}\b"
+EMAIL_RE = compile_contact_re(EMAIL_REGEX)
+PHONE_RE = compile_contact_re(PHONE_REGEX)
+CTRL_RE = re.compile(r"[\x00-\x1F\x7F-\x9F]")
+HREF_RE = re.compile(rb'''<a\s[^>]*?(?<![\w-])href\s*=\s*["']([^"'#]+)''', re.I)
 HEADERS = {'User-Agent': 'Mozilla/5.0'}
+MAX_PAGE_BYTES = 2_000_000  # pages are truncated after this many bytes
+
+# Links that are never worth fetching: binary/static files and CMS junk pages
+SKIP_EXT = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.zip', '.mp4', '.mp3', '.svg', '.webp', '.ico', '.css', '.js')
+SKIP_SEGMENTS = {'wp-login.php', 'feed'}
+SKIP_QUERIES = ('replytocom=',)
+
+# Concurrency and politeness
+MAX_WORKERS = int(os.environ.get("SCRAPER_MAX_WORKERS", 16))
+MAX_PER_HOST = 4  # maximum in-flight requests to the same host
+HOST_DELAY = 1.0  # minimum seconds between requests to the same host
+
+def is_html_response(response):
+    return 'html' in response.headers.get('Content-Type', 'text/html')
+
+CACHE_FILE = 'scraper_cache'
+CACHE_EXPIRY = 86400
+
+# Shared session so connections are kept alive and pooled across requests.
+# Cached as a resource so Streamlit reruns reuse it instead of opening a new
+# one each time.
+@st.cache_resource(show_spinner=False)
+def get_session():
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=max(32, MAX_WORKERS))
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+# On-disk cache of HTML pages, kept for a day. fetch() reads and writes it
+# itself: a CachedSession would read the whole body to store it, defeating
+# the MAX_PAGE_BYTES cap on streamed responses.
+@st.cache_resource(show_spinner=False)
+def get_cache():
+    import requests_cache
+    cache = requests_cache.SQLiteCache(CACHE_FILE)
+    # Entries are only ever replaced, not removed, so clear out expired ones on start-up
+    cache.delete(expired=True)
+    return cache
+
+# Per-host politeness state: the next free request slot and an in-flight
+# limit for each host. Also kept across reruns so the limits hold between them.
+@st.cache_resource(show_spinner=False)
+def get_host_limits():
+    slots = defaultdict(float)
+    sems = defaultdict(lambda: threading.BoundedSemaphore(MAX_PER_HOST))
+    return slots, sems, threading.Lock()
+
+def wait_for_host(url):
+    host = urlparse(url).netloc
+    slots, _, lock = get_host_limits()
+    with lock:
+        now = time.monotonic()
+        start = max(now, slots[host])
+        slots[host] = start + HOST_DELAY
+    if start > now:
+        time.sleep(start - now)
+
+def read_html(response):
+    # Stream the body and stop at MAX_PAGE_BYTES; returns None for non-HTML responses
+    with response:
+        if not is_html_response(response):
+            return None
+        content = bytearray()
+        for chunk in response.iter_content(chunk_size=65536):
+            content.extend(chunk)
+            if len(content) >= MAX_PAGE_BYTES:
+                break
+        return bytes(content[:MAX_PAGE_BYTES])
+
+def fetch(url, session=None, cache=None):
+    session = session or get_session()
+    if cache is None:
+        cache = get_cache()
+    key = cache.create_key(session.prepare_request(requests.Request('GET', url)))
+    # Fresh cached pages never reach the site, so skip the politeness limits
+    cached = cache.get_response(key)
+    if cached is not None and not cached.is_expired:
+        return cached.content
+
+    host = urlparse(url).netloc
+    _, sems, lock = get_host_limits()
+    with lock:
+        sem = sems[host]
+    with sem:
+        wait_for_host(url)
+        response = session.get(url, timeout=10, stream=True)
+        content = read_html(response)
+
+    # Only cache complete HTML pages, storing exactly the bytes read above
+    if content is not None and len(content) < MAX_PAGE_BYTES and response.status_code == 200:
+        # save_response() overwrites the entry's expiry with this argument
+        cache.save_response(cached_page(response, content), key, expires=datetime.now(timezone.utc) + timedelta(seconds=CACHE_EXPIRY))
+    return content
+
+def cached_page(response, content):
+    import requests_cache
+    # Build the cache entry from the capped body instead of handing the
+    # streamed response to the cache, which would read the rest of the body.
+    # The body is already decoded, so the wire encoding headers are dropped.
+    headers = {name: value for name, value in response.headers.items()
+               if name.lower() not in ('content-encoding', 'content-length', 'transfer-encoding')}
+    return requests_cache.CachedResponse(
+        content=content,
+        status_code=response.status_code,
+        reason=response.reason,
+        url=response.url,
+        encoding=response.encoding,
+        headers=CaseInsensitiveDict(headers),
+        request=requests_cache.CachedRequest.from_request(response.request),
+    )
+
+def normalize_url(url):
+    # Drop fragments and case differences so the same page is only stored once
+    scheme, netloc, path, query, _ = urlsplit(url)
+    return urlunsplit((scheme.lower(), netloc.lower(), path or '/', query, ''))
 
 # File paths
-VISITED_FILE = 'visited_links.json'
+VISITED_FILE = 'visited_links.jsonl'
+LEGACY_VISITED_FILE = 'visited_links.json'
 ALL_URLS_FILE = 'all_urls.json'
+SERP_CACHE_FILE = 'serp_cache.json'
+SERP_EXPIRY = 86400
 
 # Functions to load and save visited links
 def load_json(file_path):
@@ -38,32 +194,140 @@ def save_json(data_set, file_path):
     with open(file_path, 'w') as f:
         json.dump(list(data_set), f)
 
-visited_links = load_json(VISITED_FILE)
-all_urls = load_json(ALL_URLS_FILE)
+# Visited links are stored as JSON lines so each new URL is a single append
+def load_jsonl(file_path):
+    if not os.path.exists(file_path):
+        return set()
+    with open(file_path, 'r') as f:
+        lines = [line for line in f if line.strip()]
+    data_set = set()
+    for line in lines:
+        try:
+            data_set.add(json.loads(line))
+        except json.JSONDecodeError:
+            # Most likely a line cut short by a crash mid-append
+            logging.warning(f"Dropping unreadable line in {file_path}: {line.strip()!r}")
+    # Compact away duplicates and unreadable lines
+    if len(data_set) < len(lines):
+        save_jsonl(data_set, file_path)
+    return data_set
+
+def save_jsonl(data_set, file_path):
+    with open(file_path, 'w') as f:
+        f.writelines(json.dumps(item) + '\n' for item in data_set)
+
+def append_jsonl(items, file_path):
+    with open(file_path, 'a') as f:
+        f.writelines(json.dumps(item) + '\n' for item in items)
+
+def load_visited(file_path=VISITED_FILE, legacy_path=LEGACY_VISITED_FILE):
+    # Carry over visited links saved as a JSON array by earlier versions
+    if not os.path.exists(file_path) and os.path.exists(legacy_path):
+        save_jsonl({normalize_url(url) for url in load_json(legacy_path)}, file_path)
+    return load_jsonl(file_path)
+
+# Normalise URLs saved by earlier versions so they compare equal to new ones
+visited_links = load_visited()
+all_urls = {normalize_url(url) for url in load_json(ALL_URLS_FILE)}
+
+# Worker threads record visits through mark_visited; new URLs are appended
+# to the visited file in batches
+VISITED_FLUSH_EVERY = 50
+_visited_lock = threading.Lock()
+_pending_visits = []
+
+def mark_visited(url):
+    with _visited_lock:
+        visited_links.add(url)
+        _pending_visits.append(url)
+        if len(_pending_visits) >= VISITED_FLUSH_EVERY:
+            _flush_visited()
+
+def flush_visited():
+    with _visited_lock:
+        _flush_visited()
+
+def _flush_visited():
+    if _pending_visits:
+        append_jsonl(_pending_visits, VISITED_FILE)
+        _pending_visits.clear()
+
+def is_crawlable(url):
+    parts = urlsplit(url)
+    path = parts.path.lower()
+    return (parts.scheme in ('http', 'https')
+            and not path.endswith(SKIP_EXT)
+            and not SKIP_SEGMENTS.intersection(path.split('/'))
+            and not any(q in parts.query for q in SKIP_QUERIES))
+
+def fetch_search_results(query, max_results=100):
+    from duckduckgo_search import DDGS
+    with DDGS() as ddgs:
+        return [r['href'] for r in ddgs.text(query, max_results=max_results)]
+
+# Search results are cached on disk per query so repeat searches skip DuckDuckGo
+def load_serp_cache(file_path):
+    if not os.path.exists(file_path):
+        return {}
+    try:
+        with open(file_path, 'r') as f:
+            cache = json.load(f)
+    except json.JSONDecodeError:
+        logging.warning(f"Ignoring unreadable search cache {file_path}")
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+def save_serp_cache(cache, file_path):
+    # Drop expired entries and replace the file atomically so a crash can't leave it half-written
+    now = time.time()
+    cache = {key: entry for key, entry in cache.items() if now - entry['time'] < SERP_EXPIRY}
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file_path)), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, file_path)
 
 def search_urls(keyword, country, max_results=100):
     query = f"{keyword} {country}"
+    key = f"{query.strip().lower()}|{max_results}"
+    cache = load_serp_cache(SERP_CACHE_FILE)
+    entry = cache.get(key)
+    if entry and time.time() - entry['time'] < SERP_EXPIRY:
+        results = entry['urls']
+    else:
+        results = fetch_search_results(query, max_results=max_results)
+        # An empty result is more likely a DuckDuckGo hiccup than a real answer
+        if results:
+            cache[key] = {'time': time.time(), 'urls': results}
+            save_serp_cache(cache, SERP_CACHE_FILE)
+
+    # Put Indian domains first
     urls = []
-    with DDGS() as ddgs:
-        for r in ddgs.text(query, max_results=max_results):
-            url = r['href']
-            domain = urlparse(url).netloc.lower()
-            if domain.endswith('.in') or 'india' in domain:
-                urls.insert(0, url)
-            else:
-                urls.append(url)
+    for url in dict.fromkeys(normalize_url(url) for url in results):
+        domain = urlparse(url).netloc
+        if domain.endswith('.in') or 'india' in domain:
+            urls.insert(0, url)
+        else:
+            urls.append(url)
     return urls[:max_results]
 
-def get_links(base_url, max_pages=10):
+def get_links(base_url, max_pages=10, session=None):
     links = set()
     try:
-        response = requests.get(base_url, headers=HEADERS, timeout=10)
-        soup = BeautifulSoup(response.content, "html.parser")
-        domain = urlparse(base_url).netloc
+        content = fetch(base_url, session)
+        if content is None:
+            return []
+        domain = urlparse(base_url).netloc.lower()
 
-        for a_tag in soup.find_all("a", href=True):
-            href = urljoin(base_url, a_tag['href'])
-            if domain in href:
+        # Scan the raw bytes for anchor hrefs; only parse the HTML if that finds nothing
+        hrefs = [html.unescape(m.group(1).decode('utf-8', 'ignore')) for m in HREF_RE.finditer(content)]
+        if not hrefs:
+            from bs4 import BeautifulSoup, SoupStrainer
+            soup = BeautifulSoup(content, "lxml", parse_only=SoupStrainer("a", href=True))
+            hrefs = [a_tag['href'] for a_tag in soup.find_all("a", href=True)]
+
+        for href in hrefs:
+            href = normalize_url(urljoin(base_url, href))
+            if domain in href and is_crawlable(href):
                 links.add(href)
                 if len(links) >= max_pages:
                     break
@@ -71,25 +335,45 @@ def get_links(base_url, max_pages=10):
         logging.error(f"Error getting links from {base_url}: {e}")
     return list(links)
 
-def extract_entities(text):
-    doc = nlp(text)
-    names = [ent.text.strip() for ent in doc.ents if ent.label_ == "PERSON"]
-    orgs = [ent.text.strip() for ent in doc.ents if ent.label_ == "ORG"]
-    return names, orgs
+def extract_entities(texts):
+    for doc in get_nlp().pipe(texts, batch_size=SPACY_BATCH_SIZE):
+        names = [ent.text.strip() for ent in doc.ents if ent.label_ == "PERSON"]
+        orgs = [ent.text.strip() for ent in doc.ents if ent.label_ == "ORG"]
+        yield names, orgs
+
+def contact_context(text, spans, width=NER_CONTEXT):
+    # Merge the windows around each match so NER only sees nearby text
+    windows = []
+    for start, end in sorted(spans):
+        lo, hi = max(start - width, 0), end + width
+        if windows and lo <= windows[-1][1]:
+            windows[-1][1] = max(windows[-1][1], hi)
+        else:
+            windows.append([lo, hi])
+    return "\n".join(text[lo:hi] for lo, hi in windows)
 
-def scrape_page(url):
+def scrape_page(url, session=None):
     try:
-        response = requests.get(url, headers=HEADERS, timeout=10)
-        soup = BeautifulSoup(response.content, "html.parser")
+        from bs4 import BeautifulSoup
+        content = fetch(url, session)
+        if content is None:
+            mark_visited(url)
+            return None
+        soup = BeautifulSoup(content, "lxml")
+        for tag in soup(NON_TEXT_TAGS):
+            tag.decompose()
         text = soup.get_text(separator=" ", strip=True)
-        emails = list(set(re.findall(EMAIL_REGEX, text)))
-        emails = [email for email in emails if not email.startswith(('noreply', 'no-reply', 'donotreply'))]
-        phones = list(set(re.findall(PHONE_REGEX, text)))
-        names, orgs = extract_entities(text)
+        mark_visited(url)
+        # A substring check is far cheaper than the email regex on pages without any '@'
+        email_matches = []
+        if '@' in text:
+            email_matches = [m for m in EMAIL_RE.finditer(text) if not m.group().startswith(('noreply', 'no-reply', 'donotreply'))]
+        phone_matches = list(PHONE_RE.finditer(text))
+        emails = list({m.group() for m in email_matches})
+        phones = list({m.group() for m in phone_matches})
         return {
             "url": url,
-            "names": names,
-            "orgs": orgs,
+            "text": contact_context(text, [m.span() for m in email_matches + phone_matches])[:MAX_TEXT_LENGTH],
             "emails": emails,
             "phones": phones
         }
@@ -97,34 +381,54 @@ def scrape_page(url):
         logging.error(f"Error scraping {url}: {e}")
         return None
 
+def host_lanes(pages, lanes_per_host=MAX_PER_HOST):
+    # Split each host's pages into at most lanes_per_host sequential lanes and
+    # order them lane by lane across hosts, so the pool works on every host at
+    # once and a slow or rate-limited host can only occupy a few workers
+    by_host = defaultdict(list)
+    for page in pages:
+        by_host[urlparse(page).netloc].append(page)
+    lanes = [host_pages[i::lanes_per_host] for i in range(lanes_per_host) for host_pages in by_host.values()]
+    return [lane for lane in lanes if lane]
+
+def scrape_lane(lane):
+    return [scrape_page(page) for page in lane]
+
 def crawl_and_scrape(url_batch, max_pages=10):
-    global visited_links
     results = []
-    for base_url in url_batch:
-        st.info(f"Crawling: {base_url}")
-        pages = get_links(base_url, max_pages=max_pages)
-        pages.insert(0, base_url)
-        for page in pages:
-            if page in visited_links:
-                st.info(f"  → Skipping already visited: {page}")
-                continue
-            st.info(f"  → Scraping: {page}")
-            data = scrape_page(page)
-            if data:
-                visited_links.add(page)
-                for i in range(max(len(data["names"]), 1)):
-                    name = data["names"][i] if i < len(data["names"]) else None
-                    company = data["orgs"][0] if data["orgs"] else None
-                    results.append({
-                        "Person Name": name,
-                        "Designation": None,
-                        "Company": company,
-                        "Email(s)": ", ".join(data["emails"]) if data["emails"] else None,
-                        "Phone(s)": ", ".join(data["phones"]) if data["phones"] else None,
-                        "Source URL": data["url"]
-                    })
-            time.sleep(1)
-    save_json(visited_links, VISITED_FILE)
+    pages = []
+    seen = set()
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        for base_url, links in zip(url_batch, ex.map(lambda u: get_links(u, max_pages=max_pages), url_batch)):
+            st.info(f"Crawling: {base_url}")
+            links.insert(0, normalize_url(base_url))
+            for page in links:
+                if page in visited_links or page in seen:
+                    st.info(f"  → Skipping already visited: {page}")
+                    continue
+                seen.add(page)
+                pages.append(page)
+
+        st.info(f"  → Scraping {len(pages)} pages")
+        try:
+            scraped = [data for lane in ex.map(scrape_lane, host_lanes(pages)) for data in lane if data]
+        finally:
+            flush_visited()
+
+    # Run NER in one batched pass, only over pages that have contact details
+    contacts = [data for data in scraped if data["emails"] or data["phones"]]
+    for data, (names, orgs) in zip(contacts, extract_entities(data["text"] for data in contacts)):
+        for i in range(max(len(names), 1)):
+            name = names[i] if i < len(names) else None
+            company = orgs[0] if orgs else None
+            results.append({
+                "Person Name": name,
+                "Designation": None,
+                "Company": company,
+                "Email(s)": ", ".join(data["emails"]) if data["emails"] else None,
+                "Phone(s)": ", ".join(data["phones"]) if data["phones"] else None,
+                "Source URL": data["url"]
+            })
     return results
 
 def deduplicate(results):
@@ -137,26 +441,32 @@ def deduplicate(results):
             unique.append(item)
     return unique
 
-def clean_excel_string(val):
-    if isinstance(val, str):
-        return re.sub(r"[\x00-\x1F\x7F-\x9F]", "", val)
-    return val
+def prepare_dataframe(data):
+    import pandas as pd
+    df = pd.DataFrame(data).fillna("None")
+    obj_cols = df.select_dtypes('object').columns
+    df[obj_cols] = df[obj_cols].apply(lambda col: col.str.replace(CTRL_RE, "", regex=True))
+    return df
 
-def save_to_excel(data):
-    df = pd.DataFrame(data)
-    df.fillna("None", inplace=True)
-    df = df.applymap(clean_excel_string)
+def save_to_excel(df):
+    import xlsxwriter
+    # Rows are written in order so constant_memory can flush each one as it goes;
+    # pandas' to_excel writes column by column, which that mode does not support
+    # Scraped values are written as plain text: hyperlinks are capped per sheet
+    # and by length (xlsxwriter leaves the cell empty past either limit), and
+    # text such as "=1+2" must not become a formula
     output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False)
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'strings_to_urls': False, 'strings_to_formulas': False})
+    worksheet = workbook.add_worksheet()
+    worksheet.write_row(0, 0, df.columns)
+    for row, values in enumerate(df.itertuples(index=False), start=1):
+        worksheet.write_row(row, 0, values)
+    workbook.close()
     return output.getvalue()
 
-def save_to_csv(data):
-    df = pd.DataFrame(data)
-    df.fillna("None", inplace=True)
-    df = df.applymap(clean_excel_string)
+def save_to_csv(df):
     output = BytesIO()
-    df.to_csv(output, index=False)
+    df.to_csv(output, index=False, lineterminator='\n')
     return output.getvalue()
 
 def main():
@@ -169,7 +479,7 @@ def main():
     if reset_button:
         visited_links = set()
         all_urls = set()
-        save_json(visited_links, VISITED_FILE)
+        save_jsonl(visited_links, VISITED_FILE)
         save_json(all_urls, ALL_URLS_FILE)
         st.success("✅ Reset successful!")
 
@@ -203,18 +513,19 @@ def main():
 
             deduped = deduplicate(data)
             st.success(f"✅ Found {len(deduped)} unique contacts!")
-            st.dataframe(pd.DataFrame(deduped), height=400)
+            df = prepare_dataframe(deduped)
+            st.dataframe(df, height=400)
 
             col1, col2 = st.columns(2)
             col1.download_button(
                 label="Download as Excel",
-                data=save_to_excel(deduped),
+                data=save_to_excel(df),
                 file_name="India_contacts.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
             col2.download_button(
                 label="Download as CSV",
-                data=save_to_csv(deduped),
+                data=save_to_csv(df),
                 file_name="India_contacts.csv",
                 mime="text/csv"
             )
@@ -0,0 +1,286 @@
+import html
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+import openpyxl
+import pytest
+import requests
+import requests_cache
+
+import novisitedlink
+from novisitedlink import (
+    EMAIL_REGEX, HREF_RE, MAX_PAGE_BYTES, PHONE_REGEX, compile_contact_re, contact_context, fetch, host_lanes, is_crawlable, load_jsonl,
+    load_serp_cache, load_visited, prepare_dataframe, re2, save_serp_cache, save_to_excel, search_urls,
+)
+
+# Run every pattern test under both regex engines the app may use
+engines = pytest.mark.parametrize("use_re2", [
+    False,
+    pytest.param(True, marks=pytest.mark.skipif(re2 is None, reason="google-re2 not installed")),
+], ids=["re", "re2"])
+
+
+def find_emails(text, use_re2):
+    return [m.group() for m in compile_contact_re(EMAIL_REGEX, use_re2).finditer(text)]
+
+
+def find_phones(text, use_re2):
+    return [m.group() for m in compile_contact_re(PHONE_REGEX, use_re2).finditer(text)]
+
+
+@engines
+def test_email_in_plain_text_drops_trailing_dot(use_re2):
+    assert find_emails("Write to info@acme.co.in. We reply fast", use_re2) == ["info@acme.co.in"]
+
+
+@engines
+def test_email_in_mailto_link(use_re2):
+    assert find_emails('<a href="mailto:sales@acme.com">Sales</a>', use_re2) == ["sales@acme.com"]
+
+
+@engines
+def test_email_in_url_and_attribute_value(use_re2):
+    text = 'https://acme.org/?contact=hr@acme.org data-email="ops@acme.in"'
+    assert find_emails(text, use_re2) == ["hr@acme.org", "ops@acme.in"]
+
+
+@engines
+def test_phone_country_code_prefixes(use_re2):
+    text = "Call +91 9876543210, 0091-9123456789 or 919812345678"
+    assert find_phones(text, use_re2) == ["+91 9876543210", "0091-9123456789", "919812345678"]
+
+
+@engines
+def test_phone_with_trunk_zero(use_re2):
+    assert find_phones("Call 09876543210 today", use_re2) == ["09876543210"]
+
+
+@engines
+def test_phone_bare_and_trailing_dot(use_re2):
+    assert find_phones("Mobile: 9988776655.", use_re2) == ["9988776655"]
+
+
+@engines
+def test_phone_in_tel_link(use_re2):
+    assert find_phones('<a href="tel:+919876500000">Call</a>', use_re2) == ["+919876500000"]
+
+
+@engines
+def test_phone_not_matched_inside_longer_number(use_re2):
+    assert find_phones("Order id 12345987654321 and ref x09876543210", use_re2) == []
+
+
+@engines
+def test_non_ascii_letter_is_a_word_boundary(use_re2):
+    assert find_emails("\u00e9info@acme.in", use_re2) == ["info@acme.in"]
+    assert find_phones("ref \u00e99876543210", use_re2) == ["9876543210"]
+
+
+def test_load_jsonl_drops_partial_line_and_compacts(tmp_path):
+    path = tmp_path / "visited.jsonl"
+    path.write_text('"https://a.in/"\n"https://a.in/"\n"https://b.in/x"\n"https://c.in/pa')
+    assert load_jsonl(str(path)) == {"https://a.in/", "https://b.in/x"}
+    assert sorted(path.read_text().splitlines()) == ['"https://a.in/"', '"https://b.in/x"']
+
+
+def test_load_visited_migrates_and_normalizes_legacy_json_array(tmp_path):
+    path = tmp_path / "visited.jsonl"
+    legacy_path = tmp_path / "visited.json"
+    legacy_path.write_text('["https://a.in", "https://B.in/#top"]')
+    assert load_visited(str(path), str(legacy_path)) == {"https://a.in/", "https://b.in/"}
+    assert load_jsonl(str(path)) == {"https://a.in/", "https://b.in/"}
+
+
+def test_save_to_excel_keeps_urls_and_formula_like_text_past_hyperlink_limit():
+    long_url = "https://acme.in/" + "a" * 2100
+    rows = [{"Email(s)": f"u{i}@acme.in", "Source URL": f"https://acme.in/p{i}"} for i in range(65600)]
+    rows.append({"Email(s)": "=1+2", "Source URL": long_url})
+    workbook = openpyxl.load_workbook(BytesIO(save_to_excel(prepare_dataframe(rows))), read_only=True)
+    values = list(workbook.active.values)
+    assert values[0] == ("Email(s)", "Source URL")
+    assert len(values) == len(rows) + 1
+    assert values[65600] == ("u65599@acme.in", "https://acme.in/p65599")
+    assert values[-1] == ("=1+2", long_url)
+
+
+def test_load_serp_cache_treats_corrupt_file_as_empty(tmp_path):
+    path = tmp_path / "serp.json"
+    path.write_text('{"doctor india|100": {"time": 1')
+    assert load_serp_cache(str(path)) == {}
+
+
+def test_save_serp_cache_prunes_expired_entries(tmp_path):
+    path = tmp_path / "serp.json"
+    now = time.time()
+    save_serp_cache({"old": {"time": now - 2 * novisitedlink.SERP_EXPIRY, "urls": ["https://a.in/"]},
+                     "new": {"time": now, "urls": ["https://b.in/"]}}, str(path))
+    assert list(json.loads(path.read_text())) == ["new"]
+    assert [p.name for p in tmp_path.iterdir()] == ["serp.json"]
+
+
+def test_search_urls_does_not_cache_empty_results(tmp_path, monkeypatch):
+    path = tmp_path / "serp.json"
+    monkeypatch.setattr(novisitedlink, "SERP_CACHE_FILE", str(path))
+    responses = [[], ["https://acme.com/", "https://acme.in/"]]
+    monkeypatch.setattr(novisitedlink, "fetch_search_results", lambda query, max_results: responses.pop(0))
+    assert search_urls("doctor", "India") == []
+    assert not path.exists()
+    assert search_urls("doctor", "India") == ["https://acme.in/", "https://acme.com/"]
+    assert search_urls("doctor", "India") == ["https://acme.in/", "https://acme.com/"]
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits = []
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.hits.append(self.path)
+        if self.path == "/page":
+            self.send_body(200, "text/html", b"<html><body>info@acme.in</body></html>")
+        elif self.path == "/missing":
+            self.send_body(404, "text/html", b"<html><body>not found</body></html>")
+        elif self.path == "/doc.pdf":
+            self.send_body(200, "application/pdf", b"%PDF-1.4")
+        elif self.path == "/big":
+            # Chunked, so there is no Content-Length to check up front
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            chunk = b"x" * 65536
+            try:
+                for _ in range(3 * MAX_PAGE_BYTES // len(chunk)):
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+
+@pytest.fixture
+def site(monkeypatch):
+    monkeypatch.setattr(novisitedlink, "HOST_DELAY", 0)
+    SiteHandler.hits = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SiteHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return requests_cache.SQLiteCache(str(tmp_path / "cache"))
+
+
+def test_fetch_caches_complete_html_page(site, cache):
+    with requests.Session() as session:
+        first = fetch(f"{site}/page", session, cache)
+        second = fetch(f"{site}/page", session, cache)
+    assert first == second == b"<html><body>info@acme.in</body></html>"
+    assert SiteHandler.hits == ["/page"]
+    key = cache.create_key(session.prepare_request(requests.Request("GET", f"{site}/page")))
+    assert cache.get_response(key).expires > datetime.now(timezone.utc)
+
+
+def test_fetch_refetches_expired_page(site, cache):
+    with requests.Session() as session:
+        fetch(f"{site}/page", session, cache)
+        key = cache.create_key(session.prepare_request(requests.Request("GET", f"{site}/page")))
+        cache.save_response(cache.get_response(key), key, expires=datetime.now(timezone.utc) - timedelta(seconds=1))
+        fetch(f"{site}/page", session, cache)
+    assert SiteHandler.hits == ["/page", "/page"]
+
+
+def test_fetch_caps_chunked_page_and_does_not_cache_it(site, cache):
+    with requests.Session() as session:
+        content = fetch(f"{site}/big", session, cache)
+    assert len(content) == MAX_PAGE_BYTES
+    assert not cache.contains(url=f"{site}/big")
+
+
+def test_fetch_does_not_cache_error_pages(site, cache):
+    with requests.Session() as session:
+        assert fetch(f"{site}/missing", session, cache) == b"<html><body>not found</body></html>"
+    assert not cache.contains(url=f"{site}/missing")
+
+
+def test_fetch_skips_and_does_not_cache_non_html(site, cache):
+    with requests.Session() as session:
+        assert fetch(f"{site}/doc.pdf", session, cache) is None
+    assert not cache.contains(url=f"{site}/doc.pdf")
+
+
+@pytest.mark.parametrize("url", [
+    "https://acme.in/contact",
+    "https://acme.in/feedback",
+    "https://acme.in/about?page=2",
+])
+def test_is_crawlable_accepts_pages(url):
+    assert is_crawlable(url)
+
+
+@pytest.mark.parametrize("url", [
+    "https://acme.in/brochure.PDF",
+    "https://acme.in/logo.png",
+    "https://acme.in/wp-login.php",
+    "https://acme.in/blog/feed",
+    "https://acme.in/post?replytocom=12",
+    "mailto:info@acme.in",
+])
+def test_is_crawlable_rejects_non_pages(url):
+    assert not is_crawlable(url)
+
+
+def find_hrefs(content):
+    # Mirrors get_links, which unescapes each match before joining it
+    return [html.unescape(m.group(1).decode()) for m in HREF_RE.finditer(content)]
+
+
+def test_href_re_ignores_data_href():
+    assert find_hrefs(b'<a data-href="/tracked" class="x">x</a><a class="y" href="/real">y</a>') == ["/real"]
+
+
+def test_href_re_strips_fragments():
+    assert find_hrefs(b'<a href="/about#team">a</a><a href=\'#top\'>t</a>') == ["/about"]
+
+
+def test_href_re_unescapes_entities():
+    assert find_hrefs(b'<A HREF="/list?a=1&amp;b=2">l</A>') == ["/list?a=1&b=2"]
+
+
+def test_contact_context_merges_overlapping_windows():
+    text = "a" * 10 + "X" + "b" * 5 + "Y" + "c" * 10
+    assert contact_context(text, [(16, 17), (10, 11)], width=3) == "aaaXbbbbbYccc"
+
+
+def test_contact_context_keeps_separate_windows_apart():
+    text = "X" + "-" * 20 + "Y"
+    assert contact_context(text, [(0, 1), (21, 22)], width=2) == "X--\n--Y"
+
+
+def test_host_lanes_interleave_hosts():
+    pages = [f"https://a.in/{i}" for i in range(4)] + ["https://b.in/0", "https://b.in/1"]
+    assert host_lanes(pages, lanes_per_host=2) == [
+        ["https://a.in/0", "https://a.in/2"],
+        ["https://b.in/0"],
+        ["https://a.in/1", "https://a.in/3"],
+        ["https://b.in/1"],
+    ]
+
+
+def test_host_lanes_drop_empty_lanes():
+    assert host_lanes(["https://a.in/0"], lanes_per_host=3) == [["https://a.in/0"]]